@@ -2,20 +2,41 @@
 Gym Membership Management System Package
 """
 
-# Optional imports - only import if modules are available
-# This allows the package to work even if modules aren't in the path
-try:
-    from gym_membership import GymMembershipSystem
-    from models import MembershipPlan, AdditionalFeature, FeatureType
-    
-    __all__ = [
-        'GymMembershipSystem',
-        'MembershipPlan',
-        'AdditionalFeature',
-        'FeatureType'
-    ]
-except ImportError:
-    # If imports fail, define empty __all__ to prevent errors
-    __all__ = []
+import importlib
+import importlib.util
 
+# Lazy imports - public names are resolved from their modules on first access
+# (PEP 562), so importing the package does not load every submodule up front.
+_LAZY = {
+    'GymMembershipSystem': ('gym_membership', 'GymMembershipSystem'),
+    'MembershipPlan': ('models', 'MembershipPlan'),
+    'AdditionalFeature': ('models', 'AdditionalFeature'),
+    'FeatureType': ('models', 'FeatureType')
+}
 
+# Only names whose modules can be found, so the package still works (with an
+# empty __all__) when the modules aren't in the path. find_spec does not import.
+__all__ = [
+    name for name, (module_name, _) in _LAZY.items()
+    if importlib.util.find_spec(module_name) is not None
+]
+
+
+def __getattr__(name):
+    """Import and cache a public name on first access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY[name]
+    try:
+        obj = getattr(importlib.import_module(module_name), attr)
+    except ImportError as exc:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r} ({module_name} not importable)"
+        ) from exc
+    globals()[name] = obj
+    return obj
+
+
+def __dir__():
+    """Include lazily loaded names in dir() for tab-completion."""
+    return sorted(set(globals()) | set(_LAZY))
@@ -1,13 +1,26 @@
 """
-Pytest configuration and fixtures.
-This file ensures that pytest can find all modules correctly.
+Pytest configuration and shared fixtures.
+Modules are importable through the pythonpath setting in pytest.ini.
 """
 
-import sys
-from pathlib import Path
+import pytest
 
-# Add the project root to Python path
-project_root = Path(__file__).parent
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
+from gym_membership import GymMembershipSystem
 
+
+@pytest.fixture(scope="session")
+def system():
+    """Build one GymMembershipSystem for the whole test session."""
+    return GymMembershipSystem()
+
+
+@pytest.fixture(autouse=True)
+def _reset_availability(system):
+    """Snapshot availability flags and restore them after each test."""
+    plans = {k: p.available for k, p in system.membership_plans.items()}
+    features = {k: f.available for k, f in system.additional_features.items()}
+    yield
+    for key, available in plans.items():
+        system.membership_plans[key].available = available
+    for key, available in features.items():
+        system.additional_features[key].available = available
@@ -1,71 +1,72 @@
 """
 Display components for the Gym Membership Management System.
-Uses Strategy Pattern with abstract base class.
+Uses Strategy Pattern with a structural Protocol.
 """
 
-from abc import ABC, abstractmethod
-from typing import Dict
+import sys
+from typing import Dict, List, Protocol
 from models import FeatureType
 
+SEPARATOR = "=" * 60
+_PREMIUM = FeatureType.PREMIUM
 
-class DisplayComponent(ABC):
-    """Abstract base class for display components."""
+
+def _write_lines(lines: List[str]) -> None:
+    """Write all lines to stdout in a single call."""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+class DisplayComponent(Protocol):
+    """Interface for display components."""
     
-    @abstractmethod
     def display(self, items: Dict) -> None:
         """Display items."""
-        pass
+        ...
 
 
-class MembershipDisplay(DisplayComponent):
+class MembershipDisplay:
     """Displays membership plans."""
     
     def display(self, items: Dict) -> None:
-        print("\n" + "="*60)
-        print("AVAILABLE MEMBERSHIP PLANS")
-        print("="*60)
+        lines = ["", SEPARATOR, "AVAILABLE MEMBERSHIP PLANS", SEPARATOR]
         for key, plan in items.items():
             status = "✓ Available" if plan.available else "✗ Unavailable"
-            print(f"\n{plan.name} - ${plan.cost}/month [{status}]")
-            print("Benefits:")
-            for benefit in plan.benefits:
-                print(f"  • {benefit}")
-        print("\n" + "="*60)
+            lines.append("")
+            lines.append(f"{plan.name} - ${plan.cost}/month [{status}]")
+            lines.append("Benefits:")
+            lines.extend(f"  • {benefit}" for benefit in plan.benefits)
+        lines += ["", SEPARATOR]
+        _write_lines(lines)
 
 
-class FeatureDisplay(DisplayComponent):
+class FeatureDisplay:
     """Displays additional features."""
     
     def display(self, items: Dict) -> None:
-        print("\n" + "="*60)
-        print("ADDITIONAL FEATURES")
-        print("="*60)
+        lines = ["", SEPARATOR, "ADDITIONAL FEATURES", SEPARATOR]
         
-        standard = [
-            (k, v) for k, v in items.items()
-            if v.feature_type == FeatureType.STANDARD
-        ]
-        premium = [
-            (k, v) for k, v in items.items()
-            if v.feature_type == FeatureType.PREMIUM
-        ]
+        # Partition in a single pass over the registry
+        standard, premium = [], []
+        for k, v in items.items():
+            (premium if v.feature_type is _PREMIUM else standard).append((k, v))
         
         if standard:
-            print("\nStandard Features:")
+            lines += ["", "Standard Features:"]
             for key, feature in standard:
                 status = "✓" if feature.available else "✗"
-                print(f"  [{key}] {feature.name} - ${feature.cost} [{status}]")
+                lines.append(f"  [{key}] {feature.name} - ${feature.cost} [{status}]")
         
         if premium:
-            print("\nPremium Features (15% surcharge):")
+            lines += ["", "Premium Features (15% surcharge):"]
             for key, feature in premium:
                 status = "✓" if feature.available else "✗"
-                print(f"  [{key}] {feature.name} - ${feature.cost} [{status}]")
+                lines.append(f"  [{key}] {feature.name} - ${feature.cost} [{status}]")
         
-        print("\n" + "="*60)
+        lines += ["", SEPARATOR]
+        _write_lines(lines)
 
 
-class SummaryDisplay(DisplayComponent):
+class SummaryDisplay:
     """Displays membership summary."""
     
     def display(self, result: Dict) -> None:
@@ -73,26 +74,23 @@ class SummaryDisplay(DisplayComponent):
             print(f"\n❌ Error: {result.get('error', 'Unknown error')}")
             return
         
-        print("\n" + "="*60)
-        print("MEMBERSHIP SUMMARY")
-        print("="*60)
-        print(f"\nMembership: {result['membership_name']}")
-        print(f"Base Cost: ${result['base_cost']}")
+        lines = [
+            "", SEPARATOR, "MEMBERSHIP SUMMARY", SEPARATOR,
+            "", f"Membership: {result['membership_name']}",
+            f"Base Cost: ${result['base_cost']}"
+        ]
         
         if result['selected_features']:
-            print("\nFeatures:")
-            for feature in result['selected_features']:
-                print(f"  • {feature}")
-            print(f"Features Cost: ${result['features_cost']}")
+            lines += ["", "Features:"]
+            lines.extend(f"  • {feature}" for feature in result['selected_features'])
+            lines.append(f"Features Cost: ${result['features_cost']}")
         
-        print(f"\nSubtotal: ${result['subtotal']}")
+        lines += ["", f"Subtotal: ${result['subtotal']}"]
         
         for msg_key in ['premium_msg', 'group_msg', 'special_msg']:
             msg = result.get(msg_key, "")
             if msg:
-                print(msg)
+                lines.append(msg)
         
-        print(f"\n{'='*60}")
-        print(f"TOTAL: ${result['total']}")
-        print(f"{'='*60}\n")
-
+        lines += ["", SEPARATOR, f"TOTAL: ${result['total']}", SEPARATOR, ""]
+        _write_lines(lines)
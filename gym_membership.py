@@ -3,9 +3,16 @@ Gym Membership Management System - Main Application
 Uses modular architecture with separated responsibilities.
 """
 
-from typing import Dict, List, Optional, Tuple
-from models import MembershipPlan, AdditionalFeature, FeatureType
-from validators import MembershipValidator, FeatureListValidator, FeatureValidator
+import sys
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from models import MembershipPlan, AdditionalFeature, FeatureType, PricingContext
+from validators import (
+    MembershipValidator,
+    FeatureListValidator,
+    FeatureValidator,
+    ValidationResult,
+    FeatureListResult
+)
 from modifiers import (
     PremiumSurchargeModifier,
     GroupDiscountModifier,
@@ -15,75 +22,139 @@ from modifiers import (
 from factories import MembershipFactory, FeatureFactory
 from display import MembershipDisplay, FeatureDisplay, SummaryDisplay
 
+_PREMIUM = FeatureType.PREMIUM
+
+
+def _build_feature_tables(
+    features: Dict[str, AdditionalFeature]
+) -> Tuple[Dict[str, int], Dict[str, int], int, FrozenSet[str], List[int]]:
+    """Precompute per-feature costs, a bit per feature and the cost of every subset.
+    
+    Returns (feature_costs, feature_bits, premium_mask, premium_keys, cost_table).
+    """
+    feature_costs = {k: f.cost for k, f in features.items()}
+    feature_bits = {}
+    premium_mask = 0
+    costs = []
+    for i, (key, feature) in enumerate(features.items()):
+        feature_bits[key] = 1 << i
+        costs.append(feature.cost)
+        if feature.feature_type is _PREMIUM:
+            premium_mask |= 1 << i
+    premium_keys = frozenset(k for k, bit in feature_bits.items() if bit & premium_mask)
+    
+    # Each subset's cost is its lowest feature's cost plus the rest of the subset
+    cost_table = [0] * (1 << len(costs))
+    for bits in range(1, len(cost_table)):
+        rest = bits & (bits - 1)
+        lowest = (bits ^ rest).bit_length() - 1
+        cost_table[bits] = cost_table[rest] + costs[lowest]
+    return feature_costs, feature_bits, premium_mask, premium_keys, cost_table
+
 
 class GymMembershipSystem:
     """Main system orchestrating all components."""
     
+    # Components shared by every instance (MembershipValidator caches its options string)
+    membership_validator = MembershipValidator()
+    feature_validator = FeatureValidator()
+    feature_list_validator = FeatureListValidator()
+    
+    # Chain of modifiers
+    modifier_chain = PriceModifierChain([
+        PremiumSurchargeModifier(),
+        GroupDiscountModifier(),
+        SpecialOfferModifier()
+    ])
+    
+    # Display components
+    membership_display = MembershipDisplay()
+    feature_display = FeatureDisplay()
+    summary_display = SummaryDisplay()
+    
+    # Flat lookups for the pricing path, built once (costs and types never change at runtime)
+    (_feature_costs, _feature_bits, _premium_mask,
+     _premium_keys, _cost_table) = _build_feature_tables(FeatureFactory.create_all())
+    
     def __init__(self):
-        self.membership_plans = MembershipFactory.create_all()
-        self.features = FeatureFactory.create_all()
-        self.membership_validator = MembershipValidator()
-        self.feature_validator = FeatureValidator()
-        self.feature_list_validator = FeatureListValidator(self.feature_validator)
-        
-        # Chain of modifiers
-        self.modifier_chain = PriceModifierChain([
-            PremiumSurchargeModifier(),
-            GroupDiscountModifier(),
-            SpecialOfferModifier()
-        ])
-        
-        # Display components
-        self.membership_display = MembershipDisplay()
-        self.feature_display = FeatureDisplay()
-        self.summary_display = SummaryDisplay()
+        # Registries are per instance because availability can be toggled.
+        # Keys are interned so lookups with normalized keys compare by identity.
+        self.membership_plans = {
+            sys.intern(k): v for k, v in MembershipFactory.create_all().items()
+        }
+        self.features = {
+            sys.intern(k): v for k, v in FeatureFactory.create_all().items()
+        }
+    
+    def set_avail(self, key: str, available: bool) -> None:
+        """Set the availability of a membership plan or feature by key."""
+        key = key.lower()
+        item = self.membership_plans.get(key) or self.features.get(key)
+        if item is None:
+            raise KeyError(key)
+        item.available = available
     
-    def validate_membership(self, key: str) -> Tuple[bool, Optional[str]]:
+    def validate_membership(self, key: str) -> ValidationResult:
         """Validate membership selection."""
         return self.membership_validator.validate(key, self.membership_plans)
     
-    def validate_features(self, keys: List[str]) -> Tuple[bool, Optional[str], List[str]]:
+    def validate_features(self, keys: List[str]) -> FeatureListResult:
         """Validate feature selections."""
         return self.feature_list_validator.validate(keys, self.features)
     
     def _calculate_base_costs(
-        self, membership_key: str, feature_keys: List[str]
+        self, plan: MembershipPlan, feature_keys: List[str]
     ) -> Tuple[int, int, bool]:
-        """Calculate base costs and check for premium features."""
-        plan = self.membership_plans[membership_key.lower()]
+        """Calculate base costs and check for premium features.
+        
+        feature_keys must be the normalized keys returned by validate_features,
+        so no case folding happens here.
+        """
         base_cost = plan.cost
-        features_cost = sum(self.features[f].cost for f in feature_keys)
-        has_premium = any(
-            self.features[f].feature_type == FeatureType.PREMIUM
-            for f in feature_keys
-        )
+        bits = 0
+        for f in feature_keys:
+            bits |= self._feature_bits[f]
+        if bits.bit_count() == len(feature_keys):
+            features_cost = self._cost_table[bits]
+        else:
+            # Repeated keys are charged per occurrence, which the table can't express
+            features_cost = sum(self._feature_costs[f] for f in feature_keys)
+        has_premium = bool(bits & self._premium_mask)
         return base_cost, features_cost, has_premium
     
-    def calculate_total_cost(
-        self, membership_key: str, feature_keys: List[str], group_size: int = 1
-    ) -> Dict:
-        """Calculate total cost with all modifiers."""
-        # Validate
-        is_valid, error = self.validate_membership(membership_key)
-        if not is_valid:
-            return {"valid": False, "error": error, "total": -1}
+    def _prepare_selection(
+        self, membership_key: str, feature_keys: List[str]
+    ) -> Tuple[Optional[str], Optional[Tuple]]:
+        """Validate a selection and calculate its base costs.
         
-        is_valid, error, valid_features = self.validate_features(feature_keys)
-        if not is_valid:
-            return {"valid": False, "error": error, "total": -1}
+        Returns (error, selection) where selection is
+        (plan, valid_features, base_cost, features_cost, has_premium) or None.
+        """
+        # Validated as typed, so errors echo the caller's key
+        membership = self.validate_membership(membership_key)
+        if not membership.ok:
+            return membership.error, None
         
-        # Calculate base costs
+        features = self.validate_features(feature_keys)
+        if not features.ok:
+            return features.error, None
+        
+        # Normalized and interned like feature keys, so the plan lookup compares by identity
+        key = sys.intern(membership_key.lower())
+        plan = self.membership_plans[key]
+        valid_features = features.keys
         base_cost, features_cost, has_premium = self._calculate_base_costs(
-            membership_key, valid_features
+            plan, valid_features
         )
+        return None, (plan, valid_features, base_cost, features_cost, has_premium)
+    
+    def _price_selection(self, selection: Tuple, group_size: int) -> Dict:
+        """Apply all modifiers to a prepared selection."""
+        plan, valid_features, base_cost, features_cost, has_premium = selection
         subtotal = base_cost + features_cost
         
         # Build context for modifiers
-        context = {
-            'subtotal': subtotal,
-            'group_size': group_size,
-            'has_premium_features': has_premium
-        }
+        context = PricingContext.for_subtotal(subtotal, group_size, has_premium)
         
         # Apply modifiers
         modifier_results = self.modifier_chain.apply_all(context)
@@ -96,7 +167,6 @@ class GymMembershipSystem:
             modifier_results['special_discount']
         )
         
-        plan = self.membership_plans[membership_key.lower()]
         return {
             "valid": True,
             "base_cost": base_cost,
@@ -113,6 +183,47 @@ class GymMembershipSystem:
             "selected_features": [self.features[f].name for f in valid_features]
         }
     
+    def calculate_total_cost(
+        self, membership_key: str, feature_keys: List[str], group_size: int = 1
+    ) -> Dict:
+        """Calculate total cost with all modifiers."""
+        error, selection = self._prepare_selection(membership_key, feature_keys)
+        if selection is None:
+            return {"valid": False, "error": error, "total": -1}
+        return self._price_selection(selection, group_size)
+    
+    def calculate_total_cost_batch(
+        self, queries: List[Tuple[str, List[str], int]]
+    ) -> List[Dict]:
+        """Calculate total cost for many (membership_key, feature_keys, group_size) queries.
+        
+        Each distinct valid selection is validated and costed once per batch, and
+        the modifiers run once per distinct group size of that selection. Invalid
+        queries are validated individually so errors echo each query's keys as typed.
+        """
+        selections = {}
+        priced = {}
+        results = []
+        for membership_key, feature_keys, group_size in queries:
+            # Keyed on normalized keys so "Basic" and "basic" share one entry
+            selection_key = (membership_key.lower(), tuple(f.lower() for f in feature_keys))
+            selection = selections.get(selection_key)
+            if selection is None:
+                error, selection = self._prepare_selection(membership_key, feature_keys)
+                if selection is None:
+                    results.append({"valid": False, "error": error, "total": -1})
+                    continue
+                selections[selection_key] = selection
+            
+            price_key = (selection_key, group_size)
+            if price_key not in priced:
+                priced[price_key] = self._price_selection(selection, group_size)
+            # Every entry gets its own dict and list so callers can modify results safely
+            result = dict(priced[price_key])
+            result["selected_features"] = list(result["selected_features"])
+            results.append(result)
+        return results
+    
     def display_membership_plans(self) -> None:
         """Display membership plans."""
         self.membership_display.display(self.membership_plans)
@@ -126,14 +237,25 @@ class GymMembershipSystem:
         self.summary_display.display(result)
     
     def process_membership(
-        self, membership_key: str, feature_keys: List[str],
-        group_size: int = 1, confirmed: bool = False
+        self, membership_key: Optional[str] = None,
+        feature_keys: Optional[List[str]] = None,
+        group_size: int = 1, confirmed: bool = False,
+        *, result: Optional[Dict] = None
     ) -> int:
-        """Process membership and return total cost or -1."""
+        """Process membership and return total cost or -1.
+        
+        Pass a result from calculate_total_cost to avoid pricing the selection again.
+        """
+        if membership_key is None and result is None:
+            raise TypeError("process_membership() requires membership_key or result")
+        
         if not confirmed:
             return -1
         
-        result = self.calculate_total_cost(membership_key, feature_keys, group_size)
+        if result is None:
+            result = self.calculate_total_cost(
+                membership_key, feature_keys or [], group_size
+            )
         return result["total"] if result["valid"] else -1
     
     # Compatibility methods for tests
@@ -142,11 +264,11 @@ class GymMembershipSystem:
         """Compatibility property for tests."""
         return self.features
     
-    def validate_membership_selection(self, membership_key: str) -> Tuple[bool, Optional[str]]:
+    def validate_membership_selection(self, membership_key: str) -> ValidationResult:
         """Compatibility method for tests."""
         return self.validate_membership(membership_key)
     
-    def validate_feature_selection(self, feature_keys: List[str]) -> Tuple[bool, Optional[str], List[str]]:
+    def validate_feature_selection(self, feature_keys: List[str]) -> FeatureListResult:
         """Compatibility method for tests."""
         return self.validate_features(feature_keys)
     
@@ -156,38 +278,39 @@ class GymMembershipSystem:
     
     def calculate_features_cost(self, feature_keys: List[str]) -> int:
         """Compatibility method for tests."""
-        return sum(self.features[f.lower()].cost for f in feature_keys)
+        feature_keys = [f.lower() for f in feature_keys]
+        return sum(self._feature_costs[f] for f in feature_keys)
     
     def has_premium_features(self, feature_keys: List[str]) -> bool:
         """Compatibility method for tests."""
-        return any(
-            self.features[f.lower()].feature_type == FeatureType.PREMIUM
-            for f in feature_keys
-        )
+        # Stops at the first premium feature; unknown keys before it raise KeyError
+        premium_keys = self._premium_keys
+        feature_costs = self._feature_costs
+        for f in feature_keys:
+            key = f.lower()
+            if key in premium_keys:
+                return True
+            if key not in feature_costs:
+                raise KeyError(key)
+        return False
     
     def calculate_group_discount(self, total_cost: int, group_size: int) -> Tuple[int, str]:
         """Compatibility method for tests."""
         modifier = GroupDiscountModifier()
-        context = {'subtotal_with_surcharge': total_cost, 'group_size': group_size}
-        if modifier.can_apply(context):
-            return modifier.apply(context)
-        return 0, ""
+        context = PricingContext.for_subtotal(total_cost, group_size=group_size)
+        return modifier.apply_if(context) or (0, "")
     
     def calculate_special_offer_discount(self, total_cost: int) -> Tuple[int, str]:
         """Compatibility method for tests."""
         modifier = SpecialOfferModifier()
-        context = {'subtotal_with_surcharge': total_cost}
-        if modifier.can_apply(context):
-            return modifier.apply(context)
-        return 0, ""
+        context = PricingContext.for_subtotal(total_cost)
+        return modifier.apply_if(context) or (0, "")
     
     def calculate_premium_surcharge(self, total_cost: int, has_premium: bool) -> Tuple[int, str]:
         """Compatibility method for tests."""
         modifier = PremiumSurchargeModifier()
-        context = {'subtotal': total_cost, 'has_premium_features': has_premium}
-        if modifier.can_apply(context):
-            return modifier.apply(context)
-        return 0, ""
+        context = PricingContext.for_subtotal(total_cost, has_premium_features=has_premium)
+        return modifier.apply_if(context) or (0, "")
 
 
 # ============================================================================
@@ -196,13 +319,15 @@ class GymMembershipSystem:
 
 def get_user_input(prompt: str, valid_options: Optional[List[str]] = None) -> str:
     """Get validated user input."""
+    valid_set = frozenset(o.lower() for o in valid_options) if valid_options else None
+    valid_display = ', '.join(valid_options) if valid_options else ''
     while True:
         value = input(prompt).strip()
         if not value:
             print("Please enter a value.")
             continue
-        if valid_options and value.lower() not in [o.lower() for o in valid_options]:
-            print(f"Invalid. Choose: {', '.join(valid_options)}")
+        if valid_set is not None and value.lower() not in valid_set:
+            print(f"Invalid. Choose: {valid_display}")
             continue
         return value
 
@@ -257,7 +382,7 @@ def main():
     confirm = get_user_input("Confirm? (yes/no): ", ["yes", "no"]).lower()
     
     if confirm == "yes":
-        total = system.process_membership(membership_key, feature_keys, group_size, True)
+        total = system.process_membership(confirmed=True, result=result)
         print(f"\n✅ Membership confirmed! Total: ${total}")
         return total
     else:
@@ -13,7 +13,7 @@ class FeatureType(Enum):
     PREMIUM = "premium"
 
 
-@dataclass
+@dataclass(slots=True)
 class MembershipPlan:
     """Represents a membership plan."""
     name: str
@@ -25,7 +25,7 @@ class MembershipPlan:
         return f"{self.name} - ${self.cost}/month"
 
 
-@dataclass
+@dataclass(slots=True)
 class AdditionalFeature:
     """Represents an additional feature."""
     name: str
@@ -37,3 +37,17 @@ class AdditionalFeature:
         return f"{self.name} - ${self.cost}"
 
 
+@dataclass(slots=True)
+class PricingContext:
+    """Values shared by price modifiers while pricing a membership."""
+    subtotal: int = 0
+    subtotal_with_surcharge: int = 0
+    group_size: int = 1
+    has_premium_features: bool = False
+    
+    @classmethod
+    def for_subtotal(
+        cls, subtotal: int, group_size: int = 1, has_premium_features: bool = False
+    ) -> "PricingContext":
+        """Create a context with subtotal_with_surcharge seeded from the subtotal."""
+        return cls(subtotal, subtotal, group_size, has_premium_features)
@@ -1,74 +1,90 @@
 """
 Price modifiers for the Gym Membership Management System.
-Uses Strategy Pattern with abstract base class and Chain of Responsibility.
+Uses Strategy Pattern with a structural Protocol and Chain of Responsibility.
 """
 
-from abc import ABC, abstractmethod
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional, Protocol
+from models import PricingContext
 
 
-class PriceModifier(ABC):
-    """Abstract base class for price modifiers (discounts/surcharges)."""
+class PriceModifier(Protocol):
+    """Interface for price modifiers (discounts/surcharges)."""
     
-    @abstractmethod
-    def apply(self, context: Dict) -> Tuple[int, str]:
-        """Apply modification to price. Returns (amount, message)."""
-        pass
+    # Keys under which the chain records this modifier's amount and message
+    result_key: str
+    msg_key: str
     
-    @abstractmethod
-    def can_apply(self, context: Dict) -> bool:
-        """Check if this modifier can be applied."""
-        pass
+    def apply_if(self, context: PricingContext) -> Optional[Tuple[int, str]]:
+        """Apply modification if applicable. Returns (amount, message) or None."""
+        ...
+    
+    def post_apply(self, context: PricingContext, amount: int) -> None:
+        """Update the context after this modifier has been applied."""
+        ...
 
 
-class PremiumSurchargeModifier(PriceModifier):
+class PremiumSurchargeModifier:
     """Applies 15% surcharge for premium features."""
     
-    def can_apply(self, context: Dict) -> bool:
-        return context.get('has_premium_features', False)
+    result_key = 'premium_surcharge'
+    msg_key = 'premium_msg'
     
-    def apply(self, context: Dict) -> Tuple[int, str]:
-        subtotal = context.get('subtotal', 0)
-        surcharge = int(subtotal * 0.15)
+    def apply_if(self, context: PricingContext) -> Optional[Tuple[int, str]]:
+        if not context.has_premium_features:
+            return None
+        surcharge = context.subtotal * 15 // 100
         return surcharge, f"Premium features surcharge (15%): +${surcharge}"
+    
+    def post_apply(self, context: PricingContext, amount: int) -> None:
+        context.subtotal_with_surcharge = context.subtotal + amount
 
 
-class GroupDiscountModifier(PriceModifier):
+class GroupDiscountModifier:
     """Applies 10% discount for groups of 2+."""
     
-    def can_apply(self, context: Dict) -> bool:
-        return context.get('group_size', 1) >= 2
+    result_key = 'group_discount'
+    msg_key = 'group_msg'
     
-    def apply(self, context: Dict) -> Tuple[int, str]:
-        cost = context.get('subtotal_with_surcharge', context.get('subtotal', 0))
-        group_size = context.get('group_size', 1)
-        discount = int(cost * 0.10)
+    def apply_if(self, context: PricingContext) -> Optional[Tuple[int, str]]:
+        group_size = context.group_size
+        if group_size < 2:
+            return None
+        discount = context.subtotal_with_surcharge // 10
         return discount, f"Group discount (10% for {group_size}): -${discount}"
+    
+    def post_apply(self, context: PricingContext, amount: int) -> None:
+        """Group discount does not change the context."""
 
 
-class SpecialOfferModifier(PriceModifier):
+class SpecialOfferModifier:
     """Applies special offer discounts based on total cost."""
     
-    def can_apply(self, context: Dict) -> bool:
-        cost = context.get('subtotal_with_surcharge', context.get('subtotal', 0))
-        return cost > 200
+    result_key = 'special_discount'
+    msg_key = 'special_msg'
     
-    def apply(self, context: Dict) -> Tuple[int, str]:
-        cost = context.get('subtotal_with_surcharge', context.get('subtotal', 0))
+    def apply_if(self, context: PricingContext) -> Optional[Tuple[int, str]]:
+        cost = context.subtotal_with_surcharge
         if cost > 400:
             return 50, "Special offer (>$400): -$50"
-        elif cost > 200:
+        if cost > 200:
             return 20, "Special offer (>$200): -$20"
-        return 0, ""
+        return None
+    
+    def post_apply(self, context: PricingContext, amount: int) -> None:
+        """Special offer does not change the context."""
 
 
 class PriceModifierChain:
     """Chain of Responsibility for applying price modifiers."""
     
     def __init__(self, modifiers: List[PriceModifier]):
-        self.modifiers = modifiers
+        self.modifiers = tuple(modifiers)
+        # Bound methods and result keys resolved once instead of on every call
+        self._dispatch = tuple(
+            (m.apply_if, m.post_apply, m.result_key, m.msg_key) for m in self.modifiers
+        )
     
-    def apply_all(self, context: Dict) -> Dict:
+    def apply_all(self, context: PricingContext) -> Dict:
         """Apply all applicable modifiers and return results."""
         results = {
             'premium_surcharge': 0,
@@ -79,22 +95,13 @@ class PriceModifierChain:
             'special_msg': ''
         }
         
-        for modifier in self.modifiers:
-            if modifier.can_apply(context):
-                amount, msg = modifier.apply(context)
-                
-                if isinstance(modifier, PremiumSurchargeModifier):
-                    results['premium_surcharge'] = amount
-                    results['premium_msg'] = msg
-                    context['subtotal_with_surcharge'] = (
-                        context.get('subtotal', 0) + amount
-                    )
-                elif isinstance(modifier, GroupDiscountModifier):
-                    results['group_discount'] = amount
-                    results['group_msg'] = msg
-                elif isinstance(modifier, SpecialOfferModifier):
-                    results['special_discount'] = amount
-                    results['special_msg'] = msg
+        for apply_if, post_apply, result_key, msg_key in self._dispatch:
+            applied = apply_if(context)
+            if applied is not None:
+                amount, msg = applied
+                results[result_key] = amount
+                results[msg_key] = msg
+                post_apply(context, amount)
         
         return results
 
@@ -1,26 +1,53 @@
 """Quick test to verify imports work correctly."""
-import sys
-import os
 
-# Add current directory to path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import importlib.util
+from pathlib import Path
 
-try:
+import pytest
+
+
+@pytest.fixture
+def package():
+    """Load the package __init__ fresh under a private name."""
+    spec = importlib.util.spec_from_file_location(
+        "gym_package", Path(__file__).with_name("__init__.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_imports_ok():
+    """Test that the public modules import cleanly."""
     from gym_membership import GymMembershipSystem
     from models import MembershipPlan, AdditionalFeature, FeatureType
-    print("✓ All imports successful")
-    
-    # Quick functionality test
-    system = GymMembershipSystem()
+    assert all((GymMembershipSystem, MembershipPlan, AdditionalFeature, FeatureType))
+
+
+def test_package_resolves_names_lazily(package):
+    """Test that public names resolve on first access and are then cached."""
+    from gym_membership import GymMembershipSystem
+    assert package.__all__ == [
+        "GymMembershipSystem", "MembershipPlan", "AdditionalFeature", "FeatureType"
+    ]
+    assert "GymMembershipSystem" not in vars(package)
+    assert "GymMembershipSystem" in dir(package)
+    assert package.GymMembershipSystem is GymMembershipSystem
+    assert vars(package)["GymMembershipSystem"] is GymMembershipSystem
+
+
+def test_package_missing_names_raise_attribute_error(package, monkeypatch):
+    """Test that unknown or unimportable names behave as missing attributes."""
+    assert not hasattr(package, "NoSuchName")
+    monkeypatch.setitem(package._LAZY, "Missing", ("no_such_module", "Missing"))
+    with pytest.raises(AttributeError) as excinfo:
+        getattr(package, "Missing")
+    assert isinstance(excinfo.value.__cause__, ModuleNotFoundError)
+    assert not hasattr(package, "Missing")
+
+
+def test_smoke(system):
+    """Test a basic calculation on the shared session system."""
     result = system.calculate_total_cost("premium", ["personal_training"], 1)
     assert result["valid"] is True
     assert result["total"] > 0
-    print("✓ System functionality verified")
-    print("\n✅ All checks passed!")
-    
-except Exception as e:
-    print(f"❌ Error: {e}")
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
-
@@ -1,66 +1,133 @@
 """
 Validators for the Gym Membership Management System.
-Uses Strategy Pattern with abstract base class.
+Uses Strategy Pattern with a structural Protocol.
 """
 
-from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Tuple
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Protocol
 
 
-class Validator(ABC):
-    """Abstract base class for validators."""
+class ValidationResult(NamedTuple):
+    """Result of validating one value; unpacks as (is_valid, error)."""
     
-    @abstractmethod
-    def validate(self, value: str, registry: Dict) -> Tuple[bool, Optional[str]]:
+    ok: bool
+    error: Optional[str] = None
+
+
+class FeatureListResult(NamedTuple):
+    """Result of validating a feature list; unpacks as (is_valid, error, keys)."""
+    
+    ok: bool
+    error: Optional[str]
+    keys: List[str]
+
+
+# Shared success result; results are immutable so every valid call can return it
+_OK = ValidationResult(True)
+
+
+def _lookup(registry: Dict, value: str) -> Any:
+    """Look up a key as given, lowercasing it only if that misses.
+    
+    Registry keys are lowercase, so already-normalized keys skip str.lower().
+    """
+    item = registry.get(value)
+    if item is None:
+        item = registry.get(value.lower())
+    return item
+
+
+class Validator(Protocol):
+    """Interface for validators."""
+    
+    def validate(self, value: str, registry: Dict) -> ValidationResult:
         """Validate a value against a registry."""
-        pass
+        ...
 
 
-class MembershipValidator(Validator):
+class MembershipValidator:
     """Validates membership selection."""
     
-    def validate(self, value: str, registry: Dict) -> Tuple[bool, Optional[str]]:
-        key = value.lower()
-        if key not in registry:
-            options = ', '.join(registry.keys())
-            return False, f"Invalid membership: {value}. Choose: {options}"
+    __slots__ = ('_options',)
+    
+    def __init__(self):
+        # (registry, options string) for the last registry seen; plan keys never change
+        self._options = (None, '')
+    
+    def _options_for(self, registry: Dict) -> str:
+        """Return the comma-separated plan keys, joined once per registry."""
+        cached_registry, options = self._options
+        if cached_registry is not registry:
+            options = ', '.join(registry)
+            self._options = (registry, options)
+        return options
+    
+    def validate(self, value: str, registry: Dict) -> ValidationResult:
+        plan = _lookup(registry, value)
+        if plan is None:
+            return ValidationResult(
+                False, f"Invalid membership: {value}. Choose: {self._options_for(registry)}"
+            )
         
-        plan = registry[key]
         if not plan.available:
-            return False, f"Membership '{plan.name}' is unavailable."
+            return ValidationResult(False, f"Membership '{plan.name}' is unavailable.")
         
-        return True, None
+        return _OK
 
 
-class FeatureValidator(Validator):
+class FeatureValidator:
     """Validates feature selection."""
     
-    def validate(self, value: str, registry: Dict) -> Tuple[bool, Optional[str]]:
-        key = value.lower()
-        if key not in registry:
-            return False, f"Invalid feature: {value}."
+    __slots__ = ()
+    
+    def validate(self, value: str, registry: Dict) -> ValidationResult:
+        feature = _lookup(registry, value)
+        if feature is None:
+            return ValidationResult(False, f"Invalid feature: {value}.")
         
-        feature = registry[key]
         if not feature.available:
-            return False, f"Feature '{feature.name}' is unavailable."
+            return ValidationResult(False, f"Feature '{feature.name}' is unavailable.")
         
-        return True, None
+        return _OK
 
 
 class FeatureListValidator:
     """Validates a list of features."""
     
-    def __init__(self, feature_validator: FeatureValidator):
-        self.feature_validator = feature_validator
+    __slots__ = ()
     
-    def validate(self, feature_keys: List[str], registry: Dict) -> Tuple[bool, Optional[str], List[str]]:
-        """Validate multiple features and return valid keys."""
+    def validate(self, feature_keys: List[str], registry: Dict) -> FeatureListResult:
+        """Validate multiple features and return valid keys (lowercased and interned).
+        
+        Every invalid or unavailable key is reported, joined with "; " and ending
+        in a single full stop.
+        """
+        if not feature_keys:
+            # Common "no features" case; the list is fresh because callers own it
+            return FeatureListResult(True, None, [])
+        
+        # Same checks as FeatureValidator, with _lookup inlined to avoid a call per key
         valid_keys = []
-        for key in feature_keys:
-            is_valid, error = self.feature_validator.validate(key, registry)
-            if not is_valid:
-                return False, error, []
-            valid_keys.append(key.lower())
-        return True, None, valid_keys
+        errors = []
+        append = valid_keys.append
+        for raw_key in feature_keys:
+            key = raw_key
+            feature = registry.get(key)
+            if feature is None:
+                key = raw_key.lower()
+                feature = registry.get(key)
+            if feature is None:
+                errors.append(f"Invalid feature: {raw_key}")
+            elif not feature.available:
+                errors.append(f"Feature '{feature.name}' is unavailable")
+            else:
+                # An exact hit keeps the caller's object, which may be a str subclass
+                # (e.g. a StrEnum member) that sys.intern rejects; str() converts it
+                # and is a no-op for plain strings
+                append(sys.intern(str(key)))
+        if errors:
+            # One full stop for the whole message, so a single error reads as before
+            return FeatureListResult(False, "; ".join(errors) + ".", [])
+        return FeatureListResult(True, None, valid_keys)
 
 